@@ -0,0 +1,33 @@
+function readJSON(id) {
+    return JSON.parse(document.getElementById(id).textContent);
+}
+
+function variantsController(dataId) {
+    return {
+        variants: readJSON(dataId),
+        addVariant() {
+            this.variants.push({ color: '', size: '', sku: '', stock: 0, price_override: null });
+        },
+        removeVariant(index) {
+            this.variants.splice(index, 1);
+        },
+        updateSKU(index) {
+            const variant = this.variants[index];
+            if (variant.color && variant.size) {
+                variant.sku = `${variant.color}-${variant.size}`.toUpperCase();
+            }
+        }
+    };
+}
+
+function shippingController(dataId) {
+    return {
+        methods: readJSON(dataId),
+        addMethod() {
+            this.methods.push({ name: '', fee: 0, desc: '' });
+        },
+        removeMethod(index) {
+            this.methods.splice(index, 1);
+        }
+    };
+}